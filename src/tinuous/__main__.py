@@ -1,25 +1,38 @@
 from __future__ import annotations
 
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 import logging
 import os
 from pathlib import Path
 import re
-from typing import Any, Optional
+import threading
+from typing import TYPE_CHECKING, Any, Optional
 
 import click
 from click_loglevel import LogLevel
 from dotenv import load_dotenv
-from in_place import InPlace
-from yaml import safe_load
 
+# The modules for the actual work (and their dependencies, like requests) are
+# imported inside the commands so that `--help` and `--version` stay fast.
 from . import __version__
-from .base import Artifact, BuildLog
-from .config import Config, GHPathsDict
-from .github import GitHubActions
-from .state import STATE_FILE, StateFile
+from .state import STATE_FILE
 from .util import log
 
+if TYPE_CHECKING:
+    from .base import BuildAsset, CISystem
+    from .config import CIConfig, Config
+
+DEFAULT_JOBS = 8
+
+# Upper limit on `--jobs`; `APIClient.POOL_MAXSIZE` is sized to match
+MAX_JOBS = 32
+
+# Approximate number of characters of a log to read & write at a time when
+# sanitizing
+SANITIZE_BATCH_SIZE = 1 << 20
+
 
 @click.group()
 @click.version_option(
@@ -61,6 +74,10 @@ def main(ctx: click.Context, config: str, log_level: int, env: Optional[str]) ->
         datefmt="%Y-%m-%dT%H:%M:%S%z",
         level=log_level,
     )
+    # The format above uses none of these, so don't collect them per record:
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
     log.info("tinuous %s", __version__)
     ctx.obj = config
 
@@ -78,14 +95,24 @@ def main(ctx: click.Context, config: str, log_level: int, env: Optional[str]) ->
     type=click.Path(dir_okay=False, writable=True),
     help=f"Store program state in the given file  [default: {STATE_FILE}]",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1, max=MAX_JOBS),
+    default=DEFAULT_JOBS,
+    help="Download up to this many assets concurrently",
+    show_default=True,
+)
 @click.pass_obj
-def fetch(config_file: str, state_path: Optional[str], sanitize_secrets: bool) -> None:
+def fetch(
+    config_file: str, state_path: Optional[str], sanitize_secrets: bool, jobs: int
+) -> None:
     """Download logs"""
-    try:
-        with open(config_file) as fp:
-            cfg = Config.model_validate(safe_load(fp))
-    except FileNotFoundError:
-        raise click.UsageError(f"Configuration file not found: {config_file}")
+    from .config import GHPathsDict
+    from .github import GitHubActions
+    from .state import StateFile
+
+    cfg = load_config(config_file)
     if sanitize_secrets and not cfg.secrets:
         log.warning("--sanitize-secrets set but no secrets given in configuration")
     statefile = StateFile.from_file(state_path)
@@ -101,55 +128,119 @@ def fetch(config_file: str, state_path: Optional[str], sanitize_secrets: bool) -
         ds = Dataset(os.curdir)
         if not ds.is_installed():
             ds.create(force=True, cfg_proc=cfg.datalad.cfg_proc)
-    logs_added = 0
-    artifacts_added = 0
-    relassets_added = 0
-    for name, cicfg in cfg.ci.items():
-        if not cicfg.gets_builds() and not cicfg.gets_releases():
-            log.info("No paths configured for %s; skipping", name)
-            continue
+        subdatasets: set[str] = set()
+    # Targets of the downloads submitted so far
+    targets: set[Path] = set()
+    # Guards `targets`, the dataset, and `subdatasets` against the per-CI
+    # threads below
+    lock = threading.Lock()
+
+    def fetch_ci(
+        name: str,
+        cicfg: CIConfig,
+        gets_builds: bool,
+        gets_releases: bool,
+        executor: ThreadPoolExecutor,
+    ) -> tuple[CISystem, Counter[str], int]:
+        # Numbers of downloaded build assets, keyed by `BuildAsset.KIND`
+        added: Counter[str] = Counter()
+        reladded = 0
         log.info("Fetching resources from %s", name)
         since = cfg.get_since(statefile.get_since(name))
         ci = cicfg.get_system(
             repo=cfg.repo, since=since, until=cfg.until, tokens=tokens[name]
         )
+        ci.etags = statefile.get_etags(name)
         artifacts_path = getattr(cicfg.paths, "artifacts", None)
-        if cicfg.gets_builds():
+        if gets_builds:
+            futures: dict[Future[list[Path]], BuildAsset] = {}
             for obj in ci.get_build_assets(
                 cfg.types,
                 logs=cicfg.paths.logs is not None,
                 artifacts=artifacts_path is not None,
             ):
-                if isinstance(obj, BuildLog):
-                    assert cicfg.paths.logs is not None
-                    path = obj.expand_path(cicfg.paths.logs, cfg.vars)
-                elif isinstance(obj, Artifact):
-                    assert artifacts_path is not None
-                    path = obj.expand_path(artifacts_path, cfg.vars)
-                else:
-                    raise AssertionError(f"Unexpected asset type {type(obj).__name__}")
-                if cfg.datalad.enabled:
-                    ensure_datalad(ds, path, cfg.datalad.cfg_proc)
-                paths = obj.download(Path(path))
-                if isinstance(obj, BuildLog):
-                    logs_added += len(paths)
-                    if sanitize_secrets and cfg.secrets:
-                        for p in paths:
-                            sanitize(p, cfg.secrets, cfg.allow_secrets_regex)
-                elif isinstance(obj, Artifact):
-                    artifacts_added += len(paths)
-        if cicfg.gets_releases():
+                template = getattr(cicfg.paths, obj.KIND)
+                assert template is not None
+                path = obj.expand_path(template, cfg.vars)
+                # Subdatasets are created before submitting the download so
+                # that concurrent downloads never race to create the same one.
+                with lock:
+                    if claim_target(targets, obj.target_path(Path(path))):
+                        continue
+                    if cfg.datalad.enabled:
+                        ensure_datalad(ds, path, cfg.datalad.cfg_proc, subdatasets)
+                futures[executor.submit(obj.download, Path(path))] = obj
+            for fut in as_completed(futures):
+                obj = futures[fut]
+                paths = fut.result()
+                added[obj.KIND] += len(paths)
+                if obj.KIND == "logs" and sanitize_secrets and cfg.secrets:
+                    for p in paths:
+                        sanitize(
+                            p,
+                            cfg.secrets,
+                            cfg.allow_secrets_regex,
+                            cfg.any_secret_regex,
+                        )
+        if gets_releases:
             assert isinstance(ci, GitHubActions)
             assert isinstance(cicfg.paths, GHPathsDict)
             releases_path = cicfg.paths.releases
             assert releases_path is not None
+            relfutures: list[Future[list[Path]]] = []
             for asset in ci.get_release_assets():
                 path = asset.expand_path(releases_path, cfg.vars)
-                if cfg.datalad.enabled:
-                    ensure_datalad(ds, path, cfg.datalad.cfg_proc)
-                paths = asset.download(Path(path))
-                relassets_added += len(paths)
-        statefile.set_since(name, ci.new_since())
+                with lock:
+                    if claim_target(targets, asset.target_path(Path(path))):
+                        continue
+                    if cfg.datalad.enabled:
+                        ensure_datalad(ds, path, cfg.datalad.cfg_proc, subdatasets)
+                relfutures.append(executor.submit(asset.download, Path(path)))
+            for fut in as_completed(relfutures):
+                reladded += len(fut.result())
+        return (ci, added, reladded)
+
+    assets_added: Counter[str] = Counter()
+    relassets_added = 0
+    enabled: list[tuple[str, CIConfig, bool, bool]] = []
+    for name, cicfg in cfg.ci.items():
+        gets_builds = cicfg.gets_builds()
+        gets_releases = cicfg.gets_releases()
+        if gets_builds or gets_releases:
+            enabled.append((name, cicfg, gets_builds, gets_releases))
+        else:
+            log.info("No paths configured for %s; skipping", name)
+    # Each CI system is queried from its own thread so that one system's
+    # latency (or rate-limit sleeps) doesn't hold up the others, while all
+    # downloads share a single pool of `jobs` workers.
+    with ThreadPoolExecutor(max_workers=jobs) as executor, ThreadPoolExecutor(
+        max_workers=max(len(enabled), 1)
+    ) as ci_executor:
+        cifutures = {
+            ci_executor.submit(fetch_ci, *args, executor): args[0]
+            for args in enabled
+        }
+        # If a CI system fails, the others still run to completion and have
+        # their progress saved before the first error is re-raised.
+        errors: list[tuple[str, Exception]] = []
+        for cifut in as_completed(cifutures):
+            name = cifutures[cifut]
+            try:
+                ci, added, reladded = cifut.result()
+            except Exception as e:
+                errors.append((name, e))
+                continue
+            assets_added += added
+            relassets_added += reladded
+            with statefile.batch():
+                statefile.set_since(name, ci.new_since())
+                statefile.set_etags(name, ci.new_etags)
+    if errors:
+        for name, err in errors:
+            log.error("Fetching resources from %s failed: %s", name, err)
+        raise errors[0][1]
+    logs_added = assets_added["logs"]
+    artifacts_added = assets_added["artifacts"]
     log.info("%d logs downloaded", logs_added)
     log.info("%d artifacts downloaded", artifacts_added)
     log.info("%d release assets downloaded", relassets_added)
@@ -174,14 +265,20 @@ def fetch(config_file: str, state_path: Optional[str], sanitize_secrets: bool) -
     help="Sanitize strings matching secret patterns",
 )
 @click.argument("committish")
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1, max=MAX_JOBS),
+    default=DEFAULT_JOBS,
+    help="Download up to this many assets concurrently",
+    show_default=True,
+)
 @click.pass_obj
-def fetch_commit(config_file: str, committish: str, sanitize_secrets: bool) -> None:
+def fetch_commit(
+    config_file: str, committish: str, sanitize_secrets: bool, jobs: int
+) -> None:
     """Download logs for a specific commit"""
-    try:
-        with open(config_file) as fp:
-            cfg = Config.model_validate(safe_load(fp))
-    except FileNotFoundError:
-        raise click.UsageError(f"Configuration file not found: {config_file}")
+    cfg = load_config(config_file)
     if sanitize_secrets and not cfg.secrets:
         log.warning("--sanitize-secrets set but no secrets given in configuration")
     ghcfg = cfg.ci.github
@@ -198,8 +295,9 @@ def fetch_commit(config_file: str, committish: str, sanitize_secrets: bool) -> N
         ds = Dataset(os.curdir)
         if not ds.is_installed():
             ds.create(force=True, cfg_proc=cfg.datalad.cfg_proc)
-    logs_added = 0
-    artifacts_added = 0
+        subdatasets: set[str] = set()
+    # Numbers of downloaded build assets, keyed by `BuildAsset.KIND`
+    assets_added: Counter[str] = Counter()
     if not ghcfg.gets_builds():
         raise click.UsageError("No paths configured for github")
     log.info("Fetching resources from github")
@@ -207,30 +305,34 @@ def fetch_commit(config_file: str, committish: str, sanitize_secrets: bool) -> N
         repo=cfg.repo, since=datetime.now(timezone.utc), until=None, tokens=tokens
     )
     artifacts_path = ghcfg.paths.artifacts
-    for obj in ci.get_build_assets_for_commit(
-        committish,
-        cfg.types,
-        logs=ghcfg.paths.logs is not None,
-        artifacts=artifacts_path is not None,
-    ):
-        if isinstance(obj, BuildLog):
-            assert ghcfg.paths.logs is not None
-            path = obj.expand_path(ghcfg.paths.logs, cfg.vars)
-        elif isinstance(obj, Artifact):
-            assert artifacts_path is not None
-            path = obj.expand_path(artifacts_path, cfg.vars)
-        else:
-            raise AssertionError(f"Unexpected asset type {type(obj).__name__}")
-        if cfg.datalad.enabled:
-            ensure_datalad(ds, path, cfg.datalad.cfg_proc)
-        paths = obj.download(Path(path))
-        if isinstance(obj, BuildLog):
-            logs_added += len(paths)
-            if sanitize_secrets and cfg.secrets:
+    targets: set[Path] = set()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures: dict[Future[list[Path]], BuildAsset] = {}
+        for obj in ci.get_build_assets_for_commit(
+            committish,
+            cfg.types,
+            logs=ghcfg.paths.logs is not None,
+            artifacts=artifacts_path is not None,
+        ):
+            template = getattr(ghcfg.paths, obj.KIND)
+            assert template is not None
+            path = obj.expand_path(template, cfg.vars)
+            if claim_target(targets, obj.target_path(Path(path))):
+                continue
+            if cfg.datalad.enabled:
+                ensure_datalad(ds, path, cfg.datalad.cfg_proc, subdatasets)
+            futures[executor.submit(obj.download, Path(path))] = obj
+        for fut in as_completed(futures):
+            obj = futures[fut]
+            paths = fut.result()
+            assets_added[obj.KIND] += len(paths)
+            if obj.KIND == "logs" and sanitize_secrets and cfg.secrets:
                 for p in paths:
-                    sanitize(p, cfg.secrets, cfg.allow_secrets_regex)
-        elif isinstance(obj, Artifact):
-            artifacts_added += len(paths)
+                    sanitize(
+                        p, cfg.secrets, cfg.allow_secrets_regex, cfg.any_secret_regex
+                    )
+    logs_added = assets_added["logs"]
+    artifacts_added = assets_added["artifacts"]
     log.info("%d logs downloaded", logs_added)
     log.info("%d artifacts downloaded", artifacts_added)
     if cfg.datalad.enabled and (logs_added or artifacts_added):
@@ -248,48 +350,120 @@ def fetch_commit(config_file: str, committish: str, sanitize_secrets: bool) -> N
 @click.pass_obj
 def sanitize_cmd(config_file: str, path: list[str]) -> None:
     """Sanitize secrets in logs"""
+    cfg = load_config(config_file)
+    for p in path:
+        sanitize(
+            Path(p), cfg.secrets, cfg.allow_secrets_regex, cfg.any_secret_regex
+        )
+
+
+def load_config(config_file: str) -> Config:
+    import yaml
+
+    from .config import Config
+
+    # Use libyaml's parser when PyYAML was built with it
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
     try:
         with open(config_file) as fp:
-            cfg = Config.model_validate(safe_load(fp))
+            return Config.model_validate(yaml.load(fp, Loader=loader))
     except FileNotFoundError:
         raise click.UsageError(f"Configuration file not found: {config_file}")
-    for p in path:
-        sanitize(Path(p), cfg.secrets, cfg.allow_secrets_regex)
 
 
 def sanitize(
     p: Path,
     secrets: dict[str, re.Pattern[str]],
     allow_secrets: Optional[re.Pattern[str]],
+    anysecret: Optional[re.Pattern[str]] = None,
 ) -> None:
+    from in_place import InPlace
+
+    if not secrets:
+        log.debug("No secret patterns to sanitize %s with; skipping", p)
+        return
+
+    # Set by `replace()` whenever it masks a match, so that a line need not be
+    # compared with its substituted version to tell whether a secret was found
+    masked = False
+
     def replace(m: re.Match[str]) -> str:
+        nonlocal masked
         s = m.group()
         assert isinstance(s, str)
         if allow_secrets is not None and allow_secrets.search(s):
             return s
         else:
+            masked = True
             return "*" * len(s)
 
+    # `anysecret` (`Config.any_secret_regex`) is used to scan each line once
+    # for any secret at all, and only lines that match are run through the
+    # individual patterns (which are applied in sequence and so can't simply
+    # be merged into one substitution).
+    # Numbers of lines on which each secret was found; only this summary is
+    # logged at INFO level, as a leaked secret can repeat on many lines
+    found: Counter[str] = Counter()
     log.info("Sanitizing %s", p)
     with InPlace(p, mode="t", encoding="utf-8", newline="") as fp:
-        for i, line in enumerate(fp, start=1):
-            for name, rgx in secrets.items():
-                newline = rgx.sub(replace, line)
-                if newline != line:
-                    log.info("Found %s secret on line %d", name, i)
-                line = newline
-            fp.write(line)
+        i = 0
+        while lines := fp.readlines(SANITIZE_BATCH_SIZE):
+            for j, line in enumerate(lines):
+                i += 1
+                if anysecret is not None and anysecret.search(line) is None:
+                    continue
+                for name, rgx in secrets.items():
+                    masked = False
+                    line = rgx.sub(replace, line)
+                    if masked:
+                        found[name] += 1
+                        log.debug("Found %s secret on line %d", name, i)
+                lines[j] = line
+            fp.writelines(lines)
+    if found:
+        log.info(
+            "Found secrets in %s: %s",
+            p,
+            ", ".join(f"{name} on {n} line(s)" for name, n in found.items()),
+        )
 
 
-def ensure_datalad(ds: Any, path: str, cfg_proc: Optional[str]) -> None:
+def claim_target(targets: set[Path], target: Path) -> bool:
+    """
+    Add ``target`` to the set of download targets ``targets``.  If it was
+    already there, log a warning and return `True`, and the caller should skip
+    the download, as two concurrent downloads into the same location would
+    each miss the other's files and write over them.
+    """
+    if target in targets:
+        log.warning(
+            "More than one asset would be downloaded to %s; skipping duplicate",
+            target,
+        )
+        return True
+    targets.add(target)
+    return False
+
+
+def ensure_datalad(
+    ds: Any, path: str, cfg_proc: Optional[str], subdatasets: set[str]
+) -> None:
     # `ds` is actually a datalad Dataset, but the import is optional.
+    # `subdatasets` is the set of subdataset paths already known to exist; it
+    # is updated in place so that each one is only checked once per run.
     dspaths = path.split("//")
     if "" in dspaths:
         raise click.UsageError("Path contains empty '//'-delimited segment")
+    if len(dspaths) == 1 or "/".join(dspaths[:-1]) in subdatasets:
+        # The innermost subdataset (and thus every one above it) was already
+        # handled by an earlier call.
+        return
     for i in range(1, len(dspaths)):
         dsp = "/".join(dspaths[:i])
-        if not Path(dsp).exists():
-            ds.create(dsp, cfg_proc=cfg_proc)
+        if dsp not in subdatasets:
+            if not os.path.exists(dsp):
+                ds.create(dsp, cfg_proc=cfg_proc)
+            subdatasets.add(dsp)
 
 
 if __name__ == "__main__":
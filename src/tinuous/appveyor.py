@@ -7,10 +7,8 @@ import os
 from pathlib import Path
 from typing import Any, Optional
 
-from dateutil.parser import isoparse
-
 from .base import APIClient, BuildAsset, BuildLog, CISystem, EventType
-from .util import log, removeprefix, sanitize_pathname
+from .util import json_loads, log, parse_isotime, removeprefix, sanitize_pathname
 
 
 class Appveyor(CISystem):
@@ -42,12 +40,14 @@ class Appveyor(CISystem):
         )
 
     def get_builds(self) -> Iterator[dict]:
-        params = {"recordsNumber": 20}
+        params = {"recordsNumber": 100}
         while True:
-            data = self.client.get(
-                f"/api/projects/{self.accountName}/{self.repo_slug}/history",
-                params=params,
-            ).json()
+            data = json_loads(
+                self.client.get(
+                    f"/api/projects/{self.accountName}/{self.repo_slug}/history",
+                    params=params,
+                ).content
+            )
             if data.get("builds"):
                 yield from data["builds"]
                 params["startBuildId"] = data["builds"][-1]["buildId"]
@@ -68,7 +68,7 @@ class Appveyor(CISystem):
                 run_event = EventType.PULL_REQUEST
             else:
                 run_event = EventType.PUSH
-            ts = isoparse(build["created"])
+            ts = parse_isotime(build["created"])
             if ts <= self.since:
                 break
             elif self.until is not None and ts > self.until:
@@ -81,10 +81,12 @@ class Appveyor(CISystem):
                 self.register_build(ts, True)
                 if run_event in event_types:
                     for i, job in enumerate(
-                        self.client.get(
-                            f"/api/projects/{self.accountName}/{self.repo_slug}"
-                            f"/build/{build['version']}"
-                        ).json()["build"]["jobs"],
+                        json_loads(
+                            self.client.get(
+                                f"/api/projects/{self.accountName}/{self.repo_slug}"
+                                f"/build/{build['version']}"
+                            ).content
+                        )["build"]["jobs"],
                         start=1,
                     ):
                         yield AppveyorJobLog.from_job(self.client, build, job, i)
@@ -105,7 +107,7 @@ class AppveyorJobLog(BuildLog):
         job: dict[str, Any],
         index: int,
     ) -> AppveyorJobLog:
-        created_at = isoparse(build["created"])
+        created_at = parse_isotime(build["created"])
         if build.get("pullRequestId"):
             event = EventType.PULL_REQUEST
             event_id = build["pullRequestId"]
@@ -4,27 +4,29 @@ from abc import ABC, abstractmethod
 from collections.abc import Iterator
 from datetime import datetime, timezone
 from enum import Enum
-import heapq
 import os
 from pathlib import Path, PurePosixPath
 import platform
 import re
-from shutil import rmtree
+from shutil import copyfileobj, rmtree
 import sys
 import tempfile
 from time import sleep
-from typing import Any, List, Optional, Tuple
-from zipfile import BadZipFile, ZipFile
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+from zipfile import BadZipFile
 
 from pydantic import BaseModel, BeforeValidator, Field, ValidationInfo
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ChunkedEncodingError
 from requests.exceptions import ConnectionError as ReqConError
+from urllib3.exceptions import ProtocolError, ReadTimeoutError, SSLError
 
 from . import __url__, __version__
 from .util import (
     delay_until,
     expand_template,
+    extract_zipfile,
     log,
     parse_retry_after,
     sanitize_pathname,
@@ -88,32 +90,46 @@ class EventType(Enum):
 
     @classmethod
     def from_gh_event(cls, gh_event: str) -> Optional["EventType"]:
-        return {
-            "schedule": cls.CRON,
-            "push": cls.PUSH,
-            "pull_request": cls.PULL_REQUEST,
-            "pull_request_target": cls.PULL_REQUEST,
-            "workflow_dispatch": cls.MANUAL,
-            "repository_dispatch": cls.MANUAL,
-        }.get(gh_event)
+        return GH_EVENT_MAP.get(gh_event)
 
     @classmethod
     def from_travis_event(cls, travis_event: str) -> Optional["EventType"]:
-        return {
-            "cron": cls.CRON,
-            "push": cls.PUSH,
-            "pull_request": cls.PULL_REQUEST,
-            "api": cls.MANUAL,
-        }.get(travis_event)
+        return TRAVIS_EVENT_MAP.get(travis_event)
+
+
+GH_EVENT_MAP = {
+    "schedule": EventType.CRON,
+    "push": EventType.PUSH,
+    "pull_request": EventType.PULL_REQUEST,
+    "pull_request_target": EventType.PULL_REQUEST,
+    "workflow_dispatch": EventType.MANUAL,
+    "repository_dispatch": EventType.MANUAL,
+}
+
+TRAVIS_EVENT_MAP = {
+    "cron": EventType.CRON,
+    "push": EventType.PUSH,
+    "pull_request": EventType.PULL_REQUEST,
+    "api": EventType.MANUAL,
+}
 
 
 class APIClient:
     MAX_RETRIES = 12
+    # Secondary rate limit waits grow quickly, so they get fewer retries
+    SECONDARY_RATE_LIMIT_RETRIES = 4
     ZIPFILE_RETRIES = 5
+    # Large enough to keep a connection alive for each concurrent download (of
+    # which there are at most `MAX_JOBS` in `__main__`), plus one for the
+    # thread listing assets
+    POOL_MAXSIZE = 33
+    # Read downloads in large pieces so that the copy loop isn't the bottleneck
+    DOWNLOAD_CHUNK_SIZE = 1 << 20
 
     def __init__(self, base_url: str, headers: dict[str, str], is_github: bool = False):
         self.base_url = base_url
         self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=self.POOL_MAXSIZE))
         self.session.headers["User-Agent"] = USER_AGENT
         self.session.headers.update(headers)
         self.is_github = is_github
@@ -124,8 +140,13 @@ class APIClient:
         else:
             url = self.base_url.rstrip("/") + "/" + path.lstrip("/")
         i = 0
+        secondary_retries = 0
         while True:
             r = self.session.get(url, **kwargs)
+            if self.is_github and r.status_code == 403:
+                message = r.json().get("message", "")
+            else:
+                message = ""
             if (
                 r.status_code == 429
                 and "Retry-After" in r.headers
@@ -143,11 +164,7 @@ class APIClient:
                 )
                 sleep(1.25 * 2**i)
                 i += 1
-            elif (
-                self.is_github
-                and r.status_code == 403
-                and "API rate limit exceeded" in r.json().get("message", "")
-            ):
+            elif "API rate limit exceeded" in message:
                 delay = delay_until(
                     datetime.fromtimestamp(
                         int(r.headers["x-ratelimit-reset"]), tz=timezone.utc
@@ -155,6 +172,23 @@ class APIClient:
                 )
                 log.warning("Rate limit exceeded; sleeping for %s seconds", delay)
                 sleep(delay)
+            elif (
+                "secondary rate limit" in message
+                and secondary_retries < self.SECONDARY_RATE_LIMIT_RETRIES
+            ):
+                # <https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api#exceeding-the-rate-limit>
+                retry_after = parse_retry_after(r.headers.get("Retry-After", ""))
+                if retry_after is not None:
+                    delay = retry_after + 1
+                else:
+                    # GitHub says to wait at least a minute and to back off
+                    # exponentially on repeated failures.
+                    delay = 60 * 2**secondary_retries
+                log.warning(
+                    "Secondary rate limit exceeded; sleeping for %s seconds", delay
+                )
+                sleep(delay)
+                secondary_retries += 1
             else:
                 r.raise_for_status()
                 return r
@@ -167,10 +201,21 @@ class APIClient:
             try:
                 try:
                     r = self.get(path, stream=True, headers=headers)
+                    # Have urllib3 undo any Content-Encoding, like
+                    # `iter_content()` does, while copying the body straight
+                    # into the file
+                    r.raw.decode_content = True
                     with filepath.open("wb") as fp:
-                        for chunk in r.iter_content(chunk_size=8192):
-                            fp.write(chunk)
-                except (ChunkedEncodingError, ReqConError) as e:
+                        copyfileobj(r.raw, fp, self.DOWNLOAD_CHUNK_SIZE)
+                except (
+                    ChunkedEncodingError,
+                    ReqConError,
+                    # Reading `r.raw` directly raises urllib3's own exceptions
+                    # rather than the requests wrappers caught above:
+                    ProtocolError,
+                    ReadTimeoutError,
+                    SSLError,
+                ) as e:
                     if i < self.MAX_RETRIES:
                         log.warning(
                             "Download of %s interrupted: %s; waiting & retrying",
@@ -196,8 +241,7 @@ class APIClient:
         while True:
             self.download(path, zippath, headers={"Accept": "*/*"})
             try:
-                with ZipFile(zippath) as zf:
-                    zf.extractall(target_dir)
+                extract_zipfile(zippath, target_dir)
             except BadZipFile:
                 rmtree(target_dir)
                 if i < self.ZIPFILE_RETRIES:
@@ -221,6 +265,11 @@ class CISystem(ABC, BaseModel):
     since: datetime
     until: Optional[datetime] = None
     fetched: List[Tuple[datetime, bool]] = Field(default_factory=list)
+    # ETags of API listings as of the previous fetch, keyed by URL, for use in
+    # conditional requests
+    etags: Dict[str, str] = Field(default_factory=dict)
+    # ETags to store for the next fetch
+    new_etags: Dict[str, str] = Field(default_factory=dict)
 
     @staticmethod
     @abstractmethod
@@ -234,20 +283,32 @@ class CISystem(ABC, BaseModel):
         ...
 
     def register_build(self, ts: datetime, processed: bool) -> None:
-        heapq.heappush(self.fetched, (ts, processed))
+        self.fetched.append((ts, processed))
 
     def new_since(self) -> datetime:
-        prev_ts = self.since
-        while self.fetched:
-            ts, processed = heapq.heappop(self.fetched)
-            if not processed:
-                break
-            prev_ts = ts
-        return prev_ts
+        # The new floor is the latest processed build that is older than
+        # every unprocessed one; find it in two linear passes rather than by
+        # sorting.
+        oldest_unprocessed = min(
+            (ts for ts, processed in self.fetched if not processed), default=None
+        )
+        return max(
+            (
+                ts
+                for ts, processed in self.fetched
+                if processed
+                and (oldest_unprocessed is None or ts < oldest_unprocessed)
+            ),
+            default=self.since,
+        )
 
 
 # The `arbitrary_types_allowed` is for APIClient
 class BuildAsset(ABC, BaseModel, arbitrary_types_allowed=True):
+    #: The key in a `paths` configuration that holds the path template for
+    #: this kind of asset
+    KIND: ClassVar[str]
+
     client: APIClient
     created_at: datetime
     event_type: EventType
@@ -263,12 +324,12 @@ class BuildAsset(ABC, BaseModel, arbitrary_types_allowed=True):
         return {
             "timestamp": utc_date,
             "timestamp_local": self.created_at.astimezone(),
-            "year": utc_date.strftime("%Y"),
-            "month": utc_date.strftime("%m"),
-            "day": utc_date.strftime("%d"),
-            "hour": utc_date.strftime("%H"),
-            "minute": utc_date.strftime("%M"),
-            "second": utc_date.strftime("%S"),
+            "year": f"{utc_date.year:04d}",
+            "month": f"{utc_date.month:02d}",
+            "day": f"{utc_date.day:02d}",
+            "hour": f"{utc_date.hour:02d}",
+            "minute": f"{utc_date.minute:02d}",
+            "second": f"{utc_date.second:02d}",
             "type": self.event_type.value,
             "type_id": sanitize_pathname(self.event_id),
             "build_commit": self.build_commit,
@@ -281,17 +342,24 @@ class BuildAsset(ABC, BaseModel, arbitrary_types_allowed=True):
     def expand_path(self, path_template: str, variables: dict[str, str]) -> str:
         return expand_template(path_template, self.path_fields(), variables)
 
+    def target_path(self, path: Path) -> Path:
+        """
+        Return the file or directory that `download()` writes to when given
+        ``path``
+        """
+        return path
+
     @abstractmethod
     def download(self, path: Path) -> list[Path]:
         ...
 
 
 class BuildLog(BuildAsset):
-    pass
+    KIND: ClassVar[str] = "logs"
 
 
 class Artifact(BuildAsset):
-    pass
+    KIND: ClassVar[str] = "artifacts"
 
 
 # These config-related classes need to go in this file to avoid a circular
@@ -14,7 +14,7 @@ from yaml import safe_load
 from .base import APIClient
 from .base import Artifact as BaseArtifact
 from .base import BuildAsset, BuildLog, CISystem, EventType, WorkflowSpec
-from .util import log, sanitize_pathname
+from .util import json_loads, log, sanitize_pathname
 
 
 class CircleCI(CISystem):
@@ -54,7 +54,7 @@ class CircleCI(CISystem):
         self, path: str, params: Optional[dict[str, str]] = None
     ) -> Iterator[dict]:
         while True:
-            data = self.client.get(path, params=params).json()
+            data = json_loads(self.client.get(path, params=params).content)
             yield from data["items"]
             next_page_token = data["next_page_token"]
             if next_page_token is None:
@@ -269,8 +269,11 @@ class CCIArtifact(BaseArtifact):
         )
         return fields
 
+    def target_path(self, path: Path) -> Path:
+        return path / self.path
+
     def download(self, path: Path) -> List[Path]:
-        target = path / self.path
+        target = self.target_path(path)
         target.parent.mkdir(parents=True, exist_ok=True)
         if target.exists():
             log.info(
@@ -3,6 +3,7 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from collections.abc import Iterator
 from datetime import datetime, timedelta, timezone
+from functools import cached_property
 import re
 from typing import Any, Dict, List, Optional, Pattern
 
@@ -13,7 +14,9 @@ from .base import CISystem, EventType, GHWorkflowSpec, NoExtraModel, WorkflowSpe
 from .circleci import CircleCI
 from .github import GitHubActions
 from .travis import Travis
-from .util import log
+from .util import combine_patterns, log
+
+REPO_RGX = re.compile(r"[^/]+/[^/]+")
 
 
 class PathsDict(NoExtraModel):
@@ -210,7 +213,7 @@ class Config(NoExtraModel):
     @field_validator("repo")
     @classmethod
     def _validate_repo(cls, v: str) -> str:
-        if not re.fullmatch(r"[^/]+/[^/]+", v):
+        if not REPO_RGX.fullmatch(v):
             raise ValueError("Repo must be in the form 'OWNER/NAME'")
         return v
 
@@ -221,6 +224,14 @@ class Config(NoExtraModel):
             raise ValueError("timestamps must include timezone offset")
         return v
 
+    @cached_property
+    def any_secret_regex(self) -> Optional[Pattern]:
+        """
+        A single regex matching wherever any of the secret patterns matches, or
+        `None` if they cannot be combined
+        """
+        return combine_patterns(self.secrets.values())
+
     def get_since(self, state_since: Optional[datetime]) -> datetime:
         max_dt_back = datetime.now(timezone.utc) - timedelta(days=self.max_days_back)
         if state_since is None:
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timezone
 from functools import cached_property
+from itertools import chain
 from pathlib import Path
+import posixpath
 import re
 from typing import Any, Dict, List, Optional
-from urllib.parse import quote
+from urllib.parse import quote, urlencode
 
 from pydantic import BaseModel, Field
 import requests
@@ -20,7 +22,20 @@ from .base import (
     EventType,
     GHWorkflowSpec,
 )
-from .util import expand_template, get_github_token, iterfiles, log, sanitize_pathname
+from .util import (
+    expand_template,
+    get_github_token,
+    iterfiles,
+    json_loads,
+    log,
+    sanitize_pathname,
+)
+
+# GitHub only returns this many results for workflow run listings that are
+# filtered by `created` (or various other parameters)
+MAX_FILTERED_RUNS = 1000
+
+COMMIT_SHA_RGX = re.compile(r"[0-9A-Fa-f]{40}")
 
 
 class GitHubActions(CISystem):
@@ -48,7 +63,7 @@ class GitHubActions(CISystem):
     ) -> Iterator[dict]:
         while path is not None:
             r = self.client.get(path, params=params)
-            data = r.json()
+            data = json_loads(r.content)
             if isinstance(data, list):
                 yield from data
             else:
@@ -62,23 +77,100 @@ class GitHubActions(CISystem):
             path = r.links.get("next", {}).get("url")
             params = None
 
+    def list_workflows(self) -> list[Workflow]:
+        """Return all of the repository's workflows, matching or not"""
+        return [
+            Workflow.model_validate(item)
+            for item in self.paginate(
+                f"/repos/{self.repo}/actions/workflows", params={"per_page": "100"}
+            )
+        ]
+
     def get_workflows(self) -> Iterator[Workflow]:
-        for item in self.paginate(f"/repos/{self.repo}/actions/workflows"):
-            wf = Workflow.model_validate(item)
+        for wf in self.list_workflows():
             if self.workflow_spec.match(wf.path):
                 yield wf
 
-    def get_runs(self, wf: Workflow, since: datetime) -> Iterator[WorkflowRun]:
-        for item in self.paginate(f"/repos/{self.repo}/actions/workflows/{wf.id}/runs"):
-            r = WorkflowRun.model_validate(item)
-            if r.created_at <= since:
+    def get_runs(
+        self, since: datetime, workflow: Optional[Workflow] = None
+    ) -> Iterator[WorkflowRun]:
+        """
+        Yield the runs created after ``since``, newest first, either for just
+        ``workflow`` or (if it is `None`) for all workflows in the repository
+        """
+        if workflow is None:
+            path = f"/repos/{self.repo}/actions/runs"
+            what = "runs"
+        else:
+            log.info("Fetching runs for workflow %s (%s)", workflow.path, workflow.name)
+            path = f"/repos/{self.repo}/actions/workflows/{workflow.id}/runs"
+            what = f"runs of {workflow.path}"
+        # Have GitHub leave out runs that are too old to be of interest.  As
+        # the timestamp is truncated to the second, this can still return runs
+        # at `since`, which are discarded below.
+        created = since.astimezone(timezone.utc).strftime(">=%Y-%m-%dT%H:%M:%SZ")
+        params = {"created": created, "per_page": "100"}
+        r = self.get_listing(path, params)
+        if r is None:
+            log.info("No new or updated %s since last fetch", what)
+            return
+        data = json_loads(r.content)
+        items: Iterable[dict]
+        if data["total_count"] > MAX_FILTERED_RUNS:
+            log.debug(
+                "More than %d runs since %s; not filtering by creation date",
+                MAX_FILTERED_RUNS,
+                since,
+            )
+            items = self.paginate(path, params={"per_page": "100"})
+        elif (next_url := r.links.get("next", {}).get("url")) is not None:
+            items = chain(data["workflow_runs"], self.paginate(next_url))
+        else:
+            items = data["workflow_runs"]
+            self.remember_etag(path, params, r)
+        for item in items:
+            run = WorkflowRun.model_validate(item)
+            if run.created_at <= since:
                 break
-            yield r
-
-    def get_runs_for_head(self, wf: Workflow, head_sha: str) -> Iterator[WorkflowRun]:
+            yield run
+
+    def get_listing(
+        self, path: str, params: dict[str, str]
+    ) -> Optional[requests.Response]:
+        """
+        Fetch the first page of a listing, sending the ETag that was stored
+        for it on the previous fetch (if any).  Returns `None` if GitHub
+        reports that the listing has not changed since then.
+        """
+        key = f"{path}?{urlencode(params)}"
+        headers: dict[str, str] = {}
+        # With an `until` in effect, items skipped last time for being too
+        # new may be of interest now even if the listing is unchanged.
+        if self.until is None and (etag := self.etags.get(key)) is not None:
+            headers["If-None-Match"] = etag
+        r = self.client.get(path, params=params, headers=headers)
+        if r.status_code == 304:
+            # Conditional requests that return 304 do not count against the
+            # rate limit.
+            self.new_etags[key] = headers["If-None-Match"]
+            return None
+        return r
+
+    def remember_etag(
+        self, path: str, params: dict[str, str], r: requests.Response
+    ) -> None:
+        """
+        Store the ETag of a listing fetched with `get_listing()` for use on the
+        next fetch.  This should only be called if the listing fit on a single
+        page, as an unchanged first page says nothing about later ones.
+        """
+        if self.until is None and "ETag" in r.headers:
+            self.new_etags[f"{path}?{urlencode(params)}"] = r.headers["ETag"]
+
+    def get_runs_for_head(self, head_sha: str) -> Iterator[WorkflowRun]:
         for item in self.paginate(
-            f"/repos/{self.repo}/actions/workflows/{wf.id}/runs",
-            params={"head_sha": head_sha},
+            f"/repos/{self.repo}/actions/runs",
+            params={"head_sha": head_sha, "per_page": "100"},
         ):
             yield WorkflowRun.model_validate(item)
 
@@ -99,41 +191,46 @@ class GitHubActions(CISystem):
         if not logs and not artifacts:
             log.debug("No assets requested for GitHub Actions runs")
             return
+        all_workflows = self.list_workflows()
+        workflows = {
+            wf.id: wf for wf in all_workflows if self.workflow_spec.match(wf.path)
+        }
+        if not workflows:
+            log.info("No matching workflows found")
+            return
         log.info("Fetching runs newer than %s", self.since)
         if self.until is not None:
             log.info("Skipping runs newer than %s", self.until)
-        for wf in self.get_workflows():
-            log.info("Fetching runs for workflow %s (%s)", wf.path, wf.name)
-            for run in self.get_runs(wf, self.since):
-                run_event = EventType.from_gh_event(run.event)
-                ts = run.created_at
-                if self.until is not None and ts > self.until:
-                    log.info("Run %s is too new; skipping", run.run_number)
-                elif run.status != "completed":
-                    log.info("Run %s not completed; skipping", run.run_number)
-                    self.register_build(ts, False)
+        runs: Iterable[WorkflowRun]
+        if len(workflows) < len(all_workflows):
+            # Only some workflows are wanted, so list each one's runs on its
+            # own.  Otherwise, the runs of a rarely-run workflow would have to
+            # be dug out from among all the runs of busier ones.
+            runs = chain.from_iterable(
+                self.get_runs(self.since, wf) for wf in workflows.values()
+            )
+        else:
+            # All runs are wanted, so list them together.
+            runs = self.get_runs(self.since)
+        for run in runs:
+            if (wf := workflows.get(run.workflow_id)) is None:
+                continue
+            run_event = EventType.from_gh_event(run.event)
+            ts = run.created_at
+            if self.until is not None and ts > self.until:
+                log.info("Run %s of %s is too new; skipping", run.run_number, wf.path)
+            elif run.status != "completed":
+                log.info(
+                    "Run %s of %s not completed; skipping", run.run_number, wf.path
+                )
+                self.register_build(ts, False)
+            else:
+                log.info("Found run %s of %s (%s)", run.run_number, wf.path, wf.name)
+                self.register_build(ts, True)
+                if run_event in event_types:
+                    yield from self.get_run_assets(wf, run, run_event, logs, artifacts)
                 else:
-                    log.info("Found run %s", run.run_number)
-                    self.register_build(ts, True)
-                    if run_event in event_types:
-                        event_id = self.get_event_id(run, run_event)
-                        if logs:
-                            yield GHABuildLog.from_workflow_run(
-                                self.client, wf, run, run_event, event_id
-                            )
-                        if artifacts:
-                            for name, download_url in self.get_artifacts(run):
-                                yield GHAArtifact.from_workflow_run(
-                                    self.client,
-                                    wf,
-                                    run,
-                                    run_event,
-                                    event_id,
-                                    name,
-                                    download_url,
-                                )
-                    else:
-                        log.info("Event type is %r; skipping", run.event)
+                    log.info("Event type is %r; skipping", run.event)
 
     def get_build_assets_for_commit(
         self, committish: str, event_types: list[EventType], logs: bool, artifacts: bool
@@ -141,38 +238,46 @@ class GitHubActions(CISystem):
         if not logs and not artifacts:
             log.debug("No assets requested for GitHub Actions runs")
             return
-        if not re.fullmatch(r"[0-9A-Fa-f]{40}", committish):
+        if not COMMIT_SHA_RGX.fullmatch(committish):
             committish2 = self.expand_committish(committish)
             log.info("Expanded committish %r to full sha %s", committish, committish2)
             committish = committish2
+        workflows = {wf.id: wf for wf in self.get_workflows()}
+        if not workflows:
+            log.info("No matching workflows found")
+            return
         log.info("Fetching runs for commit %s", committish)
-        for wf in self.get_workflows():
-            log.info("Fetching runs for workflow %s (%s)", wf.path, wf.name)
-            for run in self.get_runs_for_head(wf, committish):
-                if run.status != "completed":
-                    log.info("Run %s not completed; skipping", run.run_number)
-                    continue
-                log.info("Found run %s", run.run_number)
-                run_event = EventType.from_gh_event(run.event)
-                if run_event in event_types:
-                    event_id = self.get_event_id(run, run_event)
-                    if logs:
-                        yield GHABuildLog.from_workflow_run(
-                            self.client, wf, run, run_event, event_id
-                        )
-                    if artifacts:
-                        for name, download_url in self.get_artifacts(run):
-                            yield GHAArtifact.from_workflow_run(
-                                self.client,
-                                wf,
-                                run,
-                                run_event,
-                                event_id,
-                                name,
-                                download_url,
-                            )
-                else:
-                    log.info("Event type is %r; skipping", run.event)
+        for run in self.get_runs_for_head(committish):
+            if (wf := workflows.get(run.workflow_id)) is None:
+                continue
+            if run.status != "completed":
+                log.info(
+                    "Run %s of %s not completed; skipping", run.run_number, wf.path
+                )
+                continue
+            log.info("Found run %s of %s (%s)", run.run_number, wf.path, wf.name)
+            run_event = EventType.from_gh_event(run.event)
+            if run_event in event_types:
+                yield from self.get_run_assets(wf, run, run_event, logs, artifacts)
+            else:
+                log.info("Event type is %r; skipping", run.event)
+
+    def get_run_assets(
+        self,
+        workflow: Workflow,
+        run: WorkflowRun,
+        event_type: EventType,
+        logs: bool,
+        artifacts: bool,
+    ) -> Iterator[BuildAsset]:
+        fields = GHAAsset.fields_from_workflow_run(
+            self.client, workflow, run, event_type, self.get_event_id(run, event_type)
+        )
+        if logs:
+            yield GHABuildLog(logs_url=run.logs_url, **fields)
+        if artifacts:
+            for name, download_url in self.get_artifacts(run):
+                yield GHAArtifact(name=name, download_url=download_url, **fields)
 
     def get_event_id(self, run: WorkflowRun, event_type: EventType) -> str:
         if event_type in (EventType.CRON, EventType.MANUAL):
@@ -186,17 +291,23 @@ class GitHubActions(CISystem):
             elif run.head_sha in self.hash2pr:
                 return self.hash2pr[run.head_sha]
             else:
-                r = self.client.get(
-                    f"/repos/{self.repo}/commits/{run.head_sha}/pulls",
-                    headers={"Accept": "application/vnd.github.groot-preview+json"},
-                )
-                if data := r.json():
+                data: list[dict[str, Any]] = []
+                # The commit-pulls endpoint ignores PRs made from forks, so
+                # don't bother querying it for runs known to be for a fork.
+                if not run.is_from_fork():
+                    r = self.client.get(
+                        f"/repos/{self.repo}/commits/{run.head_sha}/pulls",
+                        headers={
+                            "Accept": "application/vnd.github.groot-preview+json"
+                        },
+                    )
+                    data = r.json()
+                if data:
                     pr = str(data[0]["number"])
                 else:
-                    # The above endpoint ignores PRs made from forks, so we
-                    # have to fall back to performing an issue search to fill
-                    # those in.  This should hopefully be used sparingly, as
-                    # there's a 30 searches per hour rate limit.
+                    # Fall back to performing an issue search to fill in PRs
+                    # made from forks.  This should hopefully be used
+                    # sparingly, as there's a 30 searches per hour rate limit.
                     if hits := self.client.get(
                         "/search/issues",
                         params={
@@ -218,12 +329,23 @@ class GitHubActions(CISystem):
 
     def get_artifacts(self, run: WorkflowRun) -> Iterator[tuple[str, str]]:
         """Yields each artifact as a (name, download_url) pair"""
-        for artifact in self.paginate(run.artifacts_url):
+        for artifact in self.paginate(run.artifacts_url, params={"per_page": "100"}):
             if not artifact["expired"]:
                 yield (artifact["name"], artifact["archive_download_url"])
 
     def get_releases(self) -> Iterator[Release]:
-        for item in self.paginate(f"/repos/{self.repo}/releases"):
+        path = f"/repos/{self.repo}/releases"
+        params = {"per_page": "100"}
+        r = self.get_listing(path, params)
+        if r is None:
+            log.info("No new or updated releases since last fetch")
+            return
+        items: Iterable[dict] = json_loads(r.content)
+        if (next_url := r.links.get("next", {}).get("url")) is not None:
+            items = chain(items, self.paginate(next_url))
+        else:
+            self.remember_etag(path, params, r)
+        for item in items:
             yield Release.model_validate(item)
 
     def get_release_assets(self) -> Iterator[GHReleaseAsset]:
@@ -270,6 +392,32 @@ class GHAAsset(BuildAsset):
     workflow_file: str
     run_id: int
 
+    @staticmethod
+    def fields_from_workflow_run(
+        client: APIClient,
+        workflow: Workflow,
+        run: WorkflowRun,
+        event_type: EventType,
+        event_id: str,
+    ) -> dict[str, Any]:
+        """
+        Returns the constructor arguments shared by all assets of the given
+        workflow run
+        """
+        return {
+            "client": client,
+            "created_at": run.created_at,
+            "event_type": event_type,
+            "event_id": event_id,
+            "build_commit": run.head_sha,
+            "commit": run.head_sha,
+            "workflow_name": workflow.name,
+            "workflow_file": posixpath.basename(workflow.path),
+            "number": run.run_number,
+            "run_id": run.id,
+            "status": run.conclusion,
+        }
+
     def path_fields(self) -> dict[str, Any]:
         fields = super().path_fields()
         fields.update(
@@ -286,30 +434,6 @@ class GHAAsset(BuildAsset):
 class GHABuildLog(GHAAsset, BuildLog):
     logs_url: str
 
-    @classmethod
-    def from_workflow_run(
-        cls,
-        client: APIClient,
-        workflow: Workflow,
-        run: WorkflowRun,
-        event_type: EventType,
-        event_id: str,
-    ) -> GHABuildLog:
-        return cls(
-            client=client,
-            logs_url=run.logs_url,
-            created_at=run.created_at,
-            event_type=event_type,
-            event_id=event_id,
-            build_commit=run.head_sha,
-            commit=run.head_sha,
-            workflow_name=workflow.name,
-            workflow_file=workflow.path.split("/")[-1],
-            number=run.run_number,
-            run_id=run.id,
-            status=run.conclusion,
-        )
-
     def download(self, path: Path) -> list[Path]:
         path.mkdir(parents=True, exist_ok=True)
         if any(path.iterdir()):
@@ -340,42 +464,18 @@ class GHABuildLog(GHAAsset, BuildLog):
                 return []
             else:
                 raise
-        return list(path.rglob("*.txt"))
+        return [p for p in iterfiles(path) if p.suffix == ".txt"]
 
 
 class GHAArtifact(GHAAsset, Artifact):
     name: str
     download_url: str
 
-    @classmethod
-    def from_workflow_run(
-        cls,
-        client: APIClient,
-        workflow: Workflow,
-        run: WorkflowRun,
-        event_type: EventType,
-        event_id: str,
-        name: str,
-        download_url: str,
-    ) -> GHAArtifact:
-        return cls(
-            client=client,
-            created_at=run.created_at,
-            event_type=event_type,
-            event_id=event_id,
-            build_commit=run.head_sha,
-            commit=run.head_sha,
-            workflow_name=workflow.name,
-            workflow_file=workflow.path.split("/")[-1],
-            number=run.run_number,
-            run_id=run.id,
-            status=run.conclusion,
-            name=name,
-            download_url=download_url,
-        )
+    def target_path(self, path: Path) -> Path:
+        return path / self.name
 
     def download(self, path: Path) -> list[Path]:
-        target_dir = path / self.name
+        target_dir = self.target_path(path)
         target_dir.mkdir(parents=True, exist_ok=True)
         if any(target_dir.iterdir()):
             log.info(
@@ -411,12 +511,12 @@ class GHReleaseAsset(BaseModel, arbitrary_types_allowed=True):
     def path_fields(self) -> dict[str, Any]:
         utc_date = self.published_at.astimezone(timezone.utc)
         return {
-            "year": utc_date.strftime("%Y"),
-            "month": utc_date.strftime("%m"),
-            "day": utc_date.strftime("%d"),
-            "hour": utc_date.strftime("%H"),
-            "minute": utc_date.strftime("%M"),
-            "second": utc_date.strftime("%S"),
+            "year": f"{utc_date.year:04d}",
+            "month": f"{utc_date.month:02d}",
+            "day": f"{utc_date.day:02d}",
+            "hour": f"{utc_date.hour:02d}",
+            "minute": f"{utc_date.minute:02d}",
+            "second": f"{utc_date.second:02d}",
             "ci": "github",
             "type": "release",
             "release_tag": self.tag_name,
@@ -427,8 +527,11 @@ class GHReleaseAsset(BaseModel, arbitrary_types_allowed=True):
     def expand_path(self, path_template: str, variables: dict[str, str]) -> str:
         return expand_template(path_template, self.path_fields(), variables)
 
+    def target_path(self, path: Path) -> Path:
+        return path / self.name
+
     def download(self, path: Path) -> list[Path]:
-        target = path / self.name
+        target = self.target_path(path)
         if target.exists():
             log.info(
                 "Asset %s for release %s already downloaded to %s; skipping",
@@ -483,6 +586,13 @@ class WorkflowRun(BaseModel):
     artifacts_url: str
     workflow_url: str
     repository: Repository
+    head_repository: Optional[Repository] = None
+
+    def is_from_fork(self) -> bool:
+        return (
+            self.head_repository is not None
+            and self.head_repository.full_name != self.repository.full_name
+        )
 
 
 class ReleaseAsset(BaseModel):
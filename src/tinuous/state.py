@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime
+import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from .util import log
 
 STATE_FILE = ".tinuous.state.json"
+
 OLD_STATE_FILE = ".dlstate.json"
 
 
@@ -17,6 +21,9 @@ class State(BaseModel):
     travis: Optional[datetime] = None
     appveyor: Optional[datetime] = None
     circleci: Optional[datetime] = None
+    # Mapping from CI system names to the ETags of API listings retrieved on
+    # the last fetch, keyed by URL
+    etags: Dict[str, Dict[str, str]] = Field(default_factory=dict)
 
 
 class StateFile(BaseModel):
@@ -24,6 +31,9 @@ class StateFile(BaseModel):
     state: State
     migrating: bool = False
     modified: bool = False
+    # Set inside `batch()`, during which changes are only written at the end
+    batching: bool = False
+    dirty: bool = False
 
     @classmethod
     def from_file(cls, path: str | Path | None = None) -> StateFile:
@@ -62,13 +72,64 @@ class StateFile(BaseModel):
             return
         setattr(self.state, ciname, since)
         log.debug("%s timestamp floor updated to %s", ciname, since)
+        self.changed()
+
+    def get_etags(self, ciname: str) -> dict[str, str]:
+        return dict(self.state.etags.get(ciname, {}))
+
+    def set_etags(self, ciname: str, etags: dict[str, str]) -> None:
+        if self.state.etags.get(ciname, {}) == etags:
+            return
+        if etags:
+            self.state.etags[ciname] = dict(etags)
+        else:
+            self.state.etags.pop(ciname, None)
+        log.debug("%s ETags updated", ciname)
+        self.changed()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Write all changes made within the ``with`` block to disk with a single
+        write upon successful exit from the block
+        """
+        self.batching = True
+        try:
+            yield
+        finally:
+            self.batching = False
+        if self.dirty:
+            self.save()
+
+    def changed(self) -> None:
+        if self.batching:
+            self.dirty = True
+        else:
+            self.save()
+
+    def save(self) -> None:
         if self.migrating:
             log.debug("Renaming old statefile %s to %s", OLD_STATE_FILE, STATE_FILE)
             newpath = self.path.with_name(STATE_FILE)
-            newpath.write_text(self.state.model_dump_json())
+            write_atomic(newpath, self.state.model_dump_json())
             self.path.unlink(missing_ok=True)
             self.path = newpath
             self.migrating = False
         else:
-            self.path.write_text(self.state.model_dump_json())
+            write_atomic(self.path, self.state.model_dump_json())
         self.modified = True
+        self.dirty = False
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """
+    Write ``text`` to ``path`` via a temporary file so that an interrupted
+    write cannot leave ``path`` truncated
+    """
+    tmppath = path.with_name(path.name + ".tmp")
+    try:
+        tmppath.write_text(text)
+        os.replace(tmppath, path)
+    except BaseException:
+        tmppath.unlink(missing_ok=True)
+        raise
@@ -1,19 +1,19 @@
 from __future__ import annotations
 
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
 import os
 from pathlib import Path
 import subprocess
-from typing import Any, List, Optional
+from typing import Any, Callable, List, Optional
 from urllib.parse import quote
 
-from dateutil.parser import isoparse
 from pydantic import BaseModel
 import requests
 
 from .base import APIClient, BuildAsset, BuildLog, CISystem, EventType
-from .util import get_github_token, log, removeprefix
+from .util import get_github_token, json_loads, log, parse_isotime, removeprefix
 
 
 class Travis(CISystem):
@@ -76,16 +76,48 @@ class Travis(CISystem):
             return Commit.model_validate(r.json())
 
     def paginate(
-        self, path: str, params: Optional[dict[str, str]] = None
+        self,
+        path: str,
+        params: Optional[dict[str, str]] = None,
+        is_last_page: Optional[Callable[[list[dict]], bool]] = None,
     ) -> Iterator[dict]:
-        while True:
-            data = self.client.get(path, params=params).json()
-            yield from data[data["@type"]]
-            try:
-                path = data["@pagination"]["next"]["@href"]
-            except (KeyError, TypeError):
-                break
-            params = None
+        """
+        Yield the items from each page of a listing.  The next page is
+        requested in the background while the caller is still working through
+        the current one, unless ``is_last_page`` returns true for the current
+        page's items, indicating that the caller will stop before the end of
+        that page.
+        """
+        pool = ThreadPoolExecutor(max_workers=1)
+        future = pool.submit(self.get_page, path, params)
+        try:
+            while True:
+                data = future.result()
+                items = data[data["@type"]]
+                try:
+                    next_path = data["@pagination"]["next"]["@href"]
+                except (KeyError, TypeError):
+                    next_path = None
+                prefetch = next_path is not None and (
+                    is_last_page is None or not is_last_page(items)
+                )
+                if prefetch:
+                    future = pool.submit(self.get_page, next_path)
+                yield from items
+                if next_path is None:
+                    break
+                elif not prefetch:
+                    # The caller kept going after all, so fetch the next page
+                    # now.
+                    future = pool.submit(self.get_page, next_path)
+        finally:
+            # Don't hold up a caller that stops early on a prefetch that's no
+            # longer needed
+            future.cancel()
+            pool.shutdown(wait=False)
+
+    def get_page(self, path: str, params: Optional[dict[str, str]] = None) -> Any:
+        return json_loads(self.client.get(path, params=params).content)
 
     def get_build_assets(
         self, event_types: list[EventType], logs: bool, artifacts: bool  # noqa: U100
@@ -98,7 +130,8 @@ class Travis(CISystem):
             log.info("Skipping builds newer than %s", self.until)
         for build in self.paginate(
             f"/repo/{quote(self.repo, safe='')}/builds",
-            params={"include": "build.jobs"},
+            params={"include": "build.jobs", "limit": "100"},
+            is_last_page=self.reaches_since,
         ):
             event_type = EventType.from_travis_event(build["event_type"])
             if event_type is None:
@@ -112,7 +145,7 @@ class Travis(CISystem):
                 log.info("Build %s not started; skipping", build["number"])
                 continue
             else:
-                ts = isoparse(build["started_at"])
+                ts = parse_isotime(build["started_at"])
             if ts <= self.since:
                 break
             elif self.until is not None and ts > self.until:
@@ -132,6 +165,15 @@ class Travis(CISystem):
                 else:
                     log.info("Event type is %r; skipping", build["event_type"])
 
+    def reaches_since(self, builds: list[dict]) -> bool:
+        # Builds are listed newest first, so if the last build on a page
+        # started at or before `since`, `get_build_assets()` stops on that page.
+        return (
+            bool(builds)
+            and builds[-1]["started_at"] is not None
+            and parse_isotime(builds[-1]["started_at"]) <= self.since
+        )
+
     def get_commit(self, build: dict[str, Any], event_type: EventType) -> Optional[str]:
         if event_type in (EventType.CRON, EventType.MANUAL, EventType.PUSH):
             commit = build["commit"]["sha"]
@@ -167,7 +209,7 @@ class TravisJobLog(BuildLog):
         commit: Optional[str],
         event_type: EventType,
     ) -> TravisJobLog:
-        created_at = isoparse(build["started_at"])
+        created_at = parse_isotime(build["started_at"])
         event_id: str
         if event_type in (EventType.CRON, EventType.MANUAL):
             event_id = created_at.strftime("%Y%m%dT%H%M%S")
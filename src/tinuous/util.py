@@ -1,35 +1,101 @@
 from __future__ import annotations
 
 from collections import deque
-from collections.abc import Iterator, Mapping, Sequence
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import email.utils
 import logging
+import os
 from pathlib import Path
 import re
 from string import Formatter
+import sys
 from time import time
 from typing import Any, Optional
+from zipfile import ZipFile, ZipInfo
 
 from ghtoken import GHTokenNotFound, get_ghtoken
 
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads  # type: ignore[assignment]
+
+json_loads = loads
+
 log = logging.getLogger("tinuous")
 
 
-def removeprefix(s: str, prefix: str) -> str:
-    n = len(prefix)
-    return s[n:] if s[:n] == prefix else s
+if sys.version_info >= (3, 9):
+    removeprefix = str.removeprefix
+else:
+
+    def removeprefix(s: str, prefix: str) -> str:
+        n = len(prefix)
+        return s[n:] if s[:n] == prefix else s
 
 
 def iterfiles(dirpath: Path) -> Iterator[Path]:
-    dirs = deque([dirpath])
+    # `os.scandir()` is used instead of `Path.iterdir()` so that telling files
+    # from directories doesn't need a `stat()` call per entry on most systems
+    dirs = deque([os.fspath(dirpath)])
     while dirs:
         d = dirs.popleft()
-        for p in d.iterdir():
-            if p.is_dir():
-                dirs.append(p)
-            else:
-                yield p
+        with os.scandir(d) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    dirs.append(entry.path)
+                else:
+                    yield Path(entry.path)
+
+
+# Archives whose members total less than this many bytes uncompressed (like
+# most GitHub Actions log archives) are extracted in the calling thread, as
+# starting threads would cost more than it saves
+EXTRACT_PARALLEL_MIN_SIZE = 16 << 20
+
+# Maximum number of threads to extract a single archive with.  Several
+# archives may be extracted at once, one per concurrent download.
+EXTRACT_MAX_THREADS = 4
+
+
+def extract_zipfile(zippath: Path, target_dir: Path) -> None:
+    """
+    Extract all members of the zipfile at ``zippath`` into ``target_dir``,
+    decompressing the files of large archives in parallel across threads
+    """
+    with ZipFile(zippath) as zf:
+        files = [zi for zi in zf.infolist() if not zi.is_dir()]
+        jobs = min(EXTRACT_MAX_THREADS, os.cpu_count() or 1, len(files))
+        if jobs <= 1 or sum(zi.file_size for zi in files) < EXTRACT_PARALLEL_MIN_SIZE:
+            zf.extractall(target_dir)
+            return
+        for zi in zf.infolist():
+            if zi.is_dir():
+                zf.extract(zi, target_dir)
+    # ZipFile objects are not safe to read from multiple threads at once, so
+    # each worker opens the archive itself.
+    chunks = [files[i::jobs] for i in range(jobs)]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for _ in pool.map(lambda ch: extract_members(zippath, ch, target_dir), chunks):
+            pass
+
+
+def extract_members(zippath: Path, members: list[ZipInfo], target_dir: Path) -> None:
+    with ZipFile(zippath) as zf:
+        for zi in members:
+            try:
+                zf.extract(zi, target_dir)
+            except FileExistsError:
+                # Another thread created one of the member's parent
+                # directories between the existence check & the mkdir.
+                zf.extract(zi, target_dir)
+
+
+ARG_NAME_RGX = re.compile(r"\w+")
+
+ATTR_INDEX_RGX = re.compile(r"\.(?P<attr>\w+)|\[(?P<index>[^]]+)\]")
 
 
 class LazySlicingFormatter(Formatter):
@@ -64,7 +130,7 @@ class LazySlicingFormatter(Formatter):
     def get_field(
         self, field_name: str, args: Sequence[Any], kwargs: Mapping[str, Any]
     ) -> Any:
-        m = re.match(r"\w+", field_name)
+        m = ARG_NAME_RGX.match(field_name)
         assert m, f"format field name {field_name!r} does not start with arg_name"
         s_key = m.group()
         assert isinstance(s_key, str)
@@ -76,7 +142,7 @@ class LazySlicingFormatter(Formatter):
         obj = self.get_value(key, args, kwargs)
         s = field_name[m.end() :]
         while s:
-            m = re.match(r"\.(?P<attr>\w+)|\[(?P<index>[^]]+)\]", s)
+            m = ATTR_INDEX_RGX.match(s)
             assert m, f"format field name {field_name!r} has invalid attr/index"
             s = s[m.end() :]
             attr, index = m.group("attr", "index")
@@ -131,9 +197,14 @@ def get_github_token() -> str:
         )
 
 
+PATHNAME_SPECIAL_RGX = re.compile(r'[\0\x5C/<>:|"?*%]')
+
+WHITESPACE_RGX = re.compile(r"\s")
+
+
 def sanitize_pathname(s: str) -> str:
-    return re.sub(
-        r'[\0\x5C/<>:|"?*%]', lambda m: sanitize_str(m.group()), re.sub(r"\s", " ", s)
+    return PATHNAME_SPECIAL_RGX.sub(
+        lambda m: sanitize_str(m.group()), WHITESPACE_RGX.sub(" ", s)
     )
 
 
@@ -141,16 +212,62 @@ def sanitize_str(s: str) -> str:
     return "".join("%{:02x}".format(b) for b in s.encode("utf-8"))
 
 
+# Matches backreferences and numbered conditional groups, which can change
+# meaning once patterns are joined and their groups renumbered
+BACKREF_RGX = re.compile(r"\\[1-9]|\(\?P=|\(\?\([0-9]")
+
+
+def combine_patterns(patterns: Iterable[re.Pattern[str]]) -> Optional[re.Pattern[str]]:
+    """
+    Return a regex that matches wherever at least one of ``patterns`` matches,
+    or `None` if the patterns cannot be safely combined (due to backreferences,
+    numbered conditional groups, differing flags, conflicting group names,
+    etc.)
+    """
+    pats = list(patterns)
+    if not pats or len({p.flags for p in pats}) != 1:
+        return None
+    if any(BACKREF_RGX.search(p.pattern) for p in pats):
+        return None
+    try:
+        return re.compile(
+            "|".join(f"(?:{p.pattern})" for p in pats), flags=pats[0].flags
+        )
+    except re.error:
+        return None
+
+
+FRACTION_RGX = re.compile(r"\.([0-9]+)")
+
+
+def parse_isotime(s: str) -> datetime:
+    # `datetime.fromisoformat()` only accepts a trailing "Z" as of Python 3.11
+    s = s.replace("Z", "+00:00")
+    try:
+        return datetime.fromisoformat(s)
+    except ValueError:
+        # Before Python 3.11, `fromisoformat()` also rejects fractional
+        # seconds that aren't exactly three or six digits long, like the
+        # seven-digit fractions in Appveyor's timestamps, so pad or truncate
+        # them to microseconds.
+        return datetime.fromisoformat(
+            FRACTION_RGX.sub(lambda m: "." + m[1][:6].ljust(6, "0"), s)
+        )
+
+
 def delay_until(dt: datetime) -> float:
     # Take `max()` just in case we're right up against `dt`, and add 1 because
     # `sleep()` isn't always exactly accurate
     return max((dt - datetime.now(timezone.utc)).total_seconds(), 0) + 1
 
 
+# Whitespace: https://tools.ietf.org/html/rfc7230#section-3.2.4
+RETRY_AFTER_SECONDS_RGX = re.compile(r"\s*[0-9]+\s*")
+
+
 # <https://github.com/urllib3/urllib3/blob/214b184923388328919b0a4b0c15bff603aa51be/src/urllib3/util/retry.py#L304>
 def parse_retry_after(retry_after: str) -> Optional[float]:
-    # Whitespace: https://tools.ietf.org/html/rfc7230#section-3.2.4
-    if re.fullmatch(r"\s*[0-9]+\s*", retry_after):
+    if RETRY_AFTER_SECONDS_RGX.fullmatch(retry_after):
         return int(retry_after)
     else:
         retry_date_tuple = email.utils.parsedate_tz(retry_after)
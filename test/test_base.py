@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
+import json
+from typing import Any, Optional
+
 import pytest
+import requests
 
-from tinuous.base import GHWorkflowSpec
+from tinuous.__main__ import MAX_JOBS
+from tinuous.base import APIClient, GHWorkflowSpec
+from tinuous.travis import Travis
 
 
 @pytest.mark.parametrize(
@@ -65,3 +72,83 @@ from tinuous.base import GHWorkflowSpec
 )
 def test_workflowspec_match(spec: GHWorkflowSpec, path: str, r: bool) -> None:
     assert spec.match(path) is r
+
+
+@pytest.mark.parametrize(
+    "fetched,new_since",
+    [
+        ([], 0),
+        ([(3, True), (1, True), (2, True)], 3),
+        ([(3, True), (2, False), (1, True)], 1),
+        ([(3, False), (2, True), (1, True)], 2),
+        ([(3, True), (2, True), (1, False)], 0),
+        ([(2, True), (2, False), (1, True)], 1),
+    ],
+)
+def test_new_since(fetched: list[tuple[int, bool]], new_since: int) -> None:
+    def dt(n: int) -> datetime:
+        return datetime(2021, 1, 1, n, tzinfo=timezone.utc)
+
+    ci = Travis(repo="owner/name", token="x", gh_token="y", since=dt(0))
+    for n, processed in fetched:
+        ci.register_build(dt(n), processed)
+    assert ci.new_since() == dt(new_since)
+
+
+def mkresponse(
+    status_code: int, data: Any, headers: Optional[dict[str, str]] = None
+) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status_code
+    r._content = json.dumps(data).encode("utf-8")
+    r.headers.update(headers or {})
+    r.url = "https://api.github.com/repos/owner/name"
+    return r
+
+
+@pytest.mark.parametrize(
+    "headers,delays",
+    [
+        ({}, [60, 120, 240, 480]),
+        ({"Retry-After": "30"}, [31, 31, 31, 31]),
+    ],
+)
+def test_get_secondary_rate_limit(
+    headers: dict[str, str], delays: list[int], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    slept: list[float] = []
+    monkeypatch.setattr("tinuous.base.sleep", slept.append)
+    client = APIClient("https://api.github.com", {}, is_github=True)
+    limited = mkresponse(
+        403, {"message": "You have exceeded a secondary rate limit."}, headers
+    )
+    calls = 0
+
+    def get(*_args: Any, **_kwargs: Any) -> requests.Response:
+        nonlocal calls
+        calls += 1
+        return limited
+
+    monkeypatch.setattr(client.session, "get", get)
+    with pytest.raises(requests.HTTPError):
+        client.get("/repos/owner/name")
+    assert slept == delays
+    assert calls == APIClient.SECONDARY_RATE_LIMIT_RETRIES + 1
+
+
+def test_get_secondary_rate_limit_recovers(monkeypatch: pytest.MonkeyPatch) -> None:
+    slept: list[float] = []
+    monkeypatch.setattr("tinuous.base.sleep", slept.append)
+    client = APIClient("https://api.github.com", {}, is_github=True)
+    responses = [
+        mkresponse(403, {"message": "You have exceeded a secondary rate limit."}),
+        mkresponse(200, {"full_name": "owner/name"}),
+    ]
+    monkeypatch.setattr(client.session, "get", lambda *_a, **_k: responses.pop(0))
+    assert client.get("/repos/owner/name").json() == {"full_name": "owner/name"}
+    assert slept == [60]
+
+
+def test_pool_fits_max_jobs() -> None:
+    # One connection per concurrent download plus one for listing assets
+    assert APIClient.POOL_MAXSIZE == MAX_JOBS + 1
@@ -6,7 +6,7 @@ from typing import Any
 import pytest
 
 from tinuous.base import GHWorkflowSpec
-from tinuous.config import GHPathsDict, GitHubConfig
+from tinuous.config import Config, GHPathsDict, GitHubConfig
 
 
 @pytest.mark.parametrize(
@@ -139,3 +139,19 @@ from tinuous.config import GHPathsDict, GitHubConfig
 )
 def test_parse_github_config(data: dict[str, Any], cfg: GitHubConfig) -> None:
     assert GitHubConfig.model_validate(data) == cfg
+
+
+def test_any_secret_regex() -> None:
+    cfg = Config.model_validate(
+        {
+            "repo": "owner/name",
+            "ci": {"github": {"paths": {"logs": "logs/"}}},
+            "secrets": {"token": r"tok_[a-z]+", "key": r"key-[0-9]+"},
+        }
+    )
+    rgx = cfg.any_secret_regex
+    assert rgx is not None
+    assert rgx.search("using tok_abc") is not None
+    assert rgx.search("using key-42") is not None
+    assert rgx.search("nothing to see here") is None
+    assert cfg.any_secret_regex is rgx
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import json
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+import pytest
+
+from tinuous.base import APIClient, EventType, GHWorkflowSpec
+from tinuous.github import MAX_FILTERED_RUNS, GHABuildLog, GitHubActions
+
+REPO = "owner/name"
+SINCE = datetime(2021, 6, 1, tzinfo=timezone.utc)
+CREATED = ">=2021-06-01T00:00:00Z"
+RUNS = f"/repos/{REPO}/actions/runs"
+WORKFLOWS = f"/repos/{REPO}/actions/workflows"
+
+
+class FakeResponse:
+    def __init__(
+        self,
+        data: Any = None,
+        status_code: int = 200,
+        next_url: Optional[str] = None,
+        etag: Optional[str] = None,
+    ) -> None:
+        self.content = json.dumps(data).encode("utf-8")
+        self.status_code = status_code
+        self.links = {} if next_url is None else {"next": {"url": next_url}}
+        self.headers = {} if etag is None else {"ETag": etag}
+
+
+class FakeClient(APIClient):
+    """
+    An `APIClient` that serves canned responses, keyed by path and query
+    string, and records the requests made
+    """
+
+    def __init__(self, responses: dict[str, FakeResponse]) -> None:
+        self.responses = responses
+        self.requests: list[tuple[str, dict[str, str]]] = []
+
+    def get(  # type: ignore[override]
+        self,
+        path: str,
+        params: Optional[dict[str, str]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> FakeResponse:
+        key = path if not params else f"{path}?{urlencode(params)}"
+        self.requests.append((key, headers or {}))
+        r = self.responses[key]
+        if r.headers.get("ETag") is not None and (headers or {}).get(
+            "If-None-Match"
+        ) == r.headers["ETag"]:
+            return FakeResponse(status_code=304, etag=r.headers["ETag"])
+        return r
+
+
+def mkgha(client: FakeClient, etags: Optional[dict[str, str]] = None) -> GitHubActions:
+    gha = GitHubActions(
+        repo=REPO,
+        token="hunter2",
+        since=SINCE,
+        workflow_spec=GHWorkflowSpec(include=["build.yml"]),
+        etags=etags or {},
+    )
+    gha.__dict__["client"] = client
+    return gha
+
+
+def mkrun(run_id: int, hours: float, workflow_id: int = 1) -> dict[str, Any]:
+    created = (SINCE + timedelta(hours=hours)).isoformat()
+    return {
+        "id": run_id,
+        "head_branch": "main",
+        "head_sha": "0123456789abcdef0123456789abcdef01234567",
+        "run_number": run_id,
+        "event": "push",
+        "status": "completed",
+        "conclusion": "success",
+        "workflow_id": workflow_id,
+        "pull_requests": [],
+        "created_at": created,
+        "updated_at": created,
+        "logs_url": f"https://api.github.com/runs/{run_id}/logs",
+        "artifacts_url": f"https://api.github.com/runs/{run_id}/artifacts",
+        "workflow_url": f"https://api.github.com/workflows/{workflow_id}",
+        "repository": {"full_name": REPO},
+    }
+
+
+def mkworkflow(wf_id: int, path: str) -> dict[str, Any]:
+    return {
+        "id": wf_id,
+        "name": path,
+        "path": f".github/workflows/{path}",
+        "state": "active",
+        "created_at": "2021-01-01T00:00:00Z",
+        "updated_at": "2021-01-01T00:00:00Z",
+    }
+
+
+def filtered(path: str = RUNS) -> str:
+    return f"{path}?{urlencode({'created': CREATED, 'per_page': '100'})}"
+
+
+def test_get_runs_single_page() -> None:
+    client = FakeClient(
+        {
+            filtered(): FakeResponse(
+                {
+                    "total_count": 3,
+                    "workflow_runs": [mkrun(3, 2), mkrun(2, 1), mkrun(1, 0)],
+                },
+                etag='"abc"',
+            )
+        }
+    )
+    gha = mkgha(client)
+    assert [run.id for run in gha.get_runs(SINCE)] == [3, 2]
+    assert gha.new_etags == {filtered(): '"abc"'}
+
+
+def test_get_runs_not_modified() -> None:
+    client = FakeClient(
+        {
+            filtered(): FakeResponse(
+                {"total_count": 0, "workflow_runs": []}, etag='"abc"'
+            )
+        }
+    )
+    gha = mkgha(client, etags={filtered(): '"abc"'})
+    assert list(gha.get_runs(SINCE)) == []
+    assert client.requests == [(filtered(), {"If-None-Match": '"abc"'})]
+    assert gha.new_etags == {filtered(): '"abc"'}
+
+
+def test_get_runs_multiple_pages() -> None:
+    client = FakeClient(
+        {
+            filtered(): FakeResponse(
+                {"total_count": 4, "workflow_runs": [mkrun(4, 4), mkrun(3, 3)]},
+                next_url="https://api.github.com/runs?page=2",
+                etag='"abc"',
+            ),
+            "https://api.github.com/runs?page=2": FakeResponse(
+                {"total_count": 4, "workflow_runs": [mkrun(2, 2), mkrun(1, 1)]}
+            ),
+        }
+    )
+    gha = mkgha(client)
+    assert [run.id for run in gha.get_runs(SINCE)] == [4, 3, 2, 1]
+    # An unchanged first page says nothing about the later ones:
+    assert gha.new_etags == {}
+
+
+def test_get_runs_too_many_to_filter() -> None:
+    unfiltered = f"{RUNS}?per_page=100"
+    client = FakeClient(
+        {
+            filtered(): FakeResponse(
+                {"total_count": MAX_FILTERED_RUNS + 1, "workflow_runs": []}
+            ),
+            unfiltered: FakeResponse(
+                {
+                    "total_count": 5000,
+                    "workflow_runs": [mkrun(3, 2), mkrun(2, 1), mkrun(1, -1)],
+                },
+                next_url="https://api.github.com/runs?page=2",
+            ),
+        }
+    )
+    gha = mkgha(client)
+    assert [run.id for run in gha.get_runs(SINCE)] == [3, 2]
+    # Iteration stops before the second page is requested
+    assert [key for key, _ in client.requests] == [filtered(), unfiltered]
+    assert gha.new_etags == {}
+
+
+@pytest.mark.parametrize(
+    "workflows,runs_path",
+    [
+        ([mkworkflow(1, "build.yml")], RUNS),
+        (
+            [mkworkflow(1, "build.yml"), mkworkflow(2, "nightly.yml")],
+            f"{WORKFLOWS}/1/runs",
+        ),
+    ],
+)
+def test_get_build_assets_listing(workflows: list[dict], runs_path: str) -> None:
+    client = FakeClient(
+        {
+            f"{WORKFLOWS}?per_page=100": FakeResponse(
+                {"total_count": len(workflows), "workflows": workflows}
+            ),
+            filtered(runs_path): FakeResponse(
+                {"total_count": 2, "workflow_runs": [mkrun(2, 1), mkrun(1, 0)]}
+            ),
+        }
+    )
+    gha = mkgha(client)
+    assets = list(gha.get_build_assets([EventType.PUSH], logs=True, artifacts=False))
+    assert [type(a) for a in assets] == [GHABuildLog]
+    assert [key for key, _ in client.requests] == [
+        f"{WORKFLOWS}?per_page=100",
+        filtered(runs_path),
+    ]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+import re
+from typing import Optional
+
+import pytest
+
+from tinuous import __main__
+from tinuous.__main__ import claim_target, sanitize
+from tinuous.util import combine_patterns
+
+SECRETS = {
+    "abc": re.compile(r"abc"),
+    "xab": re.compile(r"xab"),
+    "token": re.compile(r"tok_[a-z]+"),
+}
+
+ORIGINAL = (
+    "nothing here\r\n"
+    "xabc\r\n"
+    "a fairly long line with tok_secret in it\r\n"
+    "tok_ok is allowed\r\n"
+    "\r\n"
+    "tok_again and abc\r\n"
+    "last line, no newline"
+)
+
+SANITIZED = (
+    "nothing here\r\n"
+    "x***\r\n"
+    "a fairly long line with ********** in it\r\n"
+    "tok_ok is allowed\r\n"
+    "\r\n"
+    "********* and ***\r\n"
+    "last line, no newline"
+)
+
+
+@pytest.mark.parametrize(
+    "anysecret", [combine_patterns(SECRETS.values()), None], ids=["combined", "none"]
+)
+def test_sanitize(
+    anysecret: Optional[re.Pattern[str]],
+    caplog: pytest.LogCaptureFixture,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    # Make the lines span several read batches
+    monkeypatch.setattr(__main__, "SANITIZE_BATCH_SIZE", 16)
+    caplog.set_level(logging.DEBUG, logger="tinuous")
+    p = tmp_path / "log.txt"
+    p.write_bytes(ORIGINAL.encode("utf-8"))
+    sanitize(p, SECRETS, re.compile(r"_ok\b"), anysecret)
+    assert p.read_bytes() == SANITIZED.encode("utf-8")
+    found = [
+        r.getMessage()
+        for r in caplog.records
+        if r.levelno == logging.DEBUG and r.getMessage().startswith("Found ")
+    ]
+    assert found == [
+        "Found abc secret on line 2",
+        "Found token secret on line 3",
+        "Found abc secret on line 6",
+        "Found token secret on line 6",
+    ]
+    summaries = [
+        r.getMessage()
+        for r in caplog.records
+        if r.levelno == logging.INFO and r.getMessage().startswith("Found ")
+    ]
+    assert summaries == [
+        f"Found secrets in {p}: abc on 2 line(s), token on 2 line(s)"
+    ]
+
+
+def test_sanitize_no_secrets(
+    caplog: pytest.LogCaptureFixture, tmp_path: Path
+) -> None:
+    caplog.set_level(logging.DEBUG, logger="tinuous")
+    p = tmp_path / "log.txt"
+    p.write_bytes(ORIGINAL.encode("utf-8"))
+    sanitize(p, {}, None)
+    assert p.read_bytes() == ORIGINAL.encode("utf-8")
+    assert not any(r.getMessage().startswith("Sanitizing") for r in caplog.records)
+
+
+def test_sanitize_clean(caplog: pytest.LogCaptureFixture, tmp_path: Path) -> None:
+    caplog.set_level(logging.DEBUG, logger="tinuous")
+    p = tmp_path / "log.txt"
+    p.write_bytes(b"nothing\r\nto see\nhere")
+    sanitize(p, SECRETS, None, combine_patterns(SECRETS.values()))
+    assert p.read_bytes() == b"nothing\r\nto see\nhere"
+    assert not any(r.getMessage().startswith("Found ") for r in caplog.records)
+
+
+def test_claim_target(caplog: pytest.LogCaptureFixture) -> None:
+    targets: set[Path] = set()
+    assert not claim_target(targets, Path("logs", "build", "1"))
+    assert not claim_target(targets, Path("logs", "build", "2"))
+    assert not caplog.records
+    assert claim_target(targets, Path("logs//build/1"))
+    assert [r.levelno for r in caplog.records] == [logging.WARNING]
+    assert targets == {Path("logs", "build", "1"), Path("logs", "build", "2")}
@@ -67,6 +67,7 @@ def test_migration(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
         "travis": "2021-02-03T04:05:06Z",
         "appveyor": None,
         "circleci": None,
+        "etags": {},
     }
 
 
@@ -98,6 +99,7 @@ def test_defaulting(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
         "travis": None,
         "appveyor": None,
         "circleci": None,
+        "etags": {},
     }
 
 
@@ -142,6 +144,7 @@ def test_empty(contents: str, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -
         "travis": None,
         "appveyor": None,
         "circleci": None,
+        "etags": {},
     }
 
 
@@ -185,4 +188,44 @@ def test_populated_explicit_path(tmp_path: Path) -> None:
         "travis": "2021-02-03T04:05:06Z",
         "appveyor": None,
         "circleci": None,
+        "etags": {},
     }
+
+
+def test_etags(tmp_path: Path) -> None:
+    f = tmp_path / STATE_FILE
+    statefile = StateFile.from_file(f)
+    assert statefile.get_etags("github") == {}
+    etags = {"/repos/foo/bar/actions/runs?per_page=100": 'W/"abc123"'}
+    statefile.set_etags("github", etags)
+    assert statefile.modified
+    assert statefile.get_etags("github") == etags
+    assert statefile.get_etags("travis") == {}
+    with f.open() as fp:
+        data = json.load(fp)
+    assert data["etags"] == {"github": etags}
+    statefile = StateFile.from_file(f)
+    assert statefile.get_etags("github") == etags
+    statefile.set_etags("github", {})
+    assert statefile.get_etags("github") == {}
+    with f.open() as fp:
+        data = json.load(fp)
+    assert data["etags"] == {}
+
+
+def test_batch(tmp_path: Path) -> None:
+    f = tmp_path / STATE_FILE
+    statefile = StateFile.from_file(f)
+    newdt = datetime(2021, 6, 11, 15, 11, 50, tzinfo=timezone.utc)
+    etags = {"/repos/foo/bar/actions/runs?per_page=100": 'W/"abc123"'}
+    with statefile.batch():
+        statefile.set_since("github", newdt)
+        statefile.set_etags("github", etags)
+        assert not f.exists()
+        modified_in_batch = statefile.modified
+    assert not modified_in_batch
+    assert statefile.modified
+    with f.open() as fp:
+        data = json.load(fp)
+    assert data["github"] == "2021-06-11T15:11:50Z"
+    assert data["etags"] == {"github": etags}